@@ -1,308 +1,682 @@
-import discord
-from discord.ext import commands
-import os
-import asyncio
-import time
-import logging
-from collections import defaultdict
-from dotenv import load_dotenv
-
-# Modern API imports
-try:
-    from openai import OpenAI
-except ImportError:
-    print("❌ Please install: pip install openai>=1.0.0")
-    exit(1)
-
-try:
-    import google.generativeai as genai
-except ImportError:
-    print("❌ Please install: pip install google-generativeai")
-    exit(1)
-
-# Load environment variables
-load_dotenv()
-
-# Configuration
-TOKEN = os.getenv("DISCORD_BOT_TOKEN")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
-
-# Validate required environment variables
-if not TOKEN:
-    print("❌ DISCORD_BOT_TOKEN not found in environment variables")
-    exit(1)
-
-# Setup logging
-logging.basicConfig(
-    level=getattr(logging, LOG_LEVEL.upper()),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
-# Initialize AI clients
-openai_client = None
-if OPENAI_API_KEY:
-    openai_client = OpenAI(api_key=OPENAI_API_KEY)
-    logger.info("✅ OpenAI client initialized")
-else:
-    logger.warning("⚠️ OpenAI API key not found")
-
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-    logger.info("✅ Gemini client initialized")
-else:
-    logger.warning("⚠️ Gemini API key not found")
-
-# Bot setup
-intents = discord.Intents.default()
-intents.message_content = True
-intents.messages = True
-intents.guilds = True
-intents.members = True
-
-bot = commands.Bot(command_prefix='/', intents=intents)
-
-# Anti-spam configuration
-user_message_times = defaultdict(list)
-SPAM_TIME_WINDOW = 10  # seconds
-SPAM_MESSAGE_LIMIT = 5  # messages allowed per window
-
-# Rate limiting for AI commands
-user_ai_times = defaultdict(list)
-AI_TIME_WINDOW = 60  # seconds
-AI_MESSAGE_LIMIT = 3  # AI requests per minute
-
-async def get_or_create_logs_channel(guild):
-    """Get existing logs channel or create one"""
-    log_channel = discord.utils.get(guild.text_channels, name="logs")
-    
-    if not log_channel:
-        try:
-            # Create logs channel with restricted permissions
-            overwrites = {
-                guild.default_role: discord.PermissionOverwrite(send_messages=False),
-                guild.me: discord.PermissionOverwrite(send_messages=True)
-            }
-            log_channel = await guild.create_text_channel(
-                'logs', 
-                topic='Bot message logs',
-                overwrites=overwrites
-            )
-            logger.info(f"✅ Created logs channel in {guild.name}")
-        except discord.Forbidden:
-            logger.error(f"❌ No permission to create logs channel in {guild.name}")
-        except Exception as e:
-            logger.error(f"❌ Error creating logs channel: {e}")
-    
-    return log_channel
-
-def check_spam(user_id, message_times_dict, time_window, message_limit):
-    """Check if user is spamming"""
-    now = time.time()
-    user_times = message_times_dict[user_id]
-    # Remove old timestamps
-    user_times[:] = [t for t in user_times if now - t < time_window]
-    user_times.append(now)
-    return len(user_times) > message_limit
-
-@bot.event
-async def on_ready():
-    logger.info(f'✅ {bot.user} is online!')
-    logger.info(f'Bot is in {len(bot.guilds)} guilds')
-    
-    # Sync slash commands
-    try:
-        synced = await bot.tree.sync()
-        logger.info(f"✅ Synced {len(synced)} slash commands")
-    except Exception as e:
-        logger.error(f"❌ Failed to sync slash commands: {e}")
-
-@bot.event
-async def on_guild_join(guild):
-    """Create logs channel when bot joins a new guild"""
-    await get_or_create_logs_channel(guild)
-
-@bot.event
-async def on_message(message):
-    if message.author.bot:
-        return
-
-    # Anti-spam check
-    if check_spam(message.author.id, user_message_times, SPAM_TIME_WINDOW, SPAM_MESSAGE_LIMIT):
-        try:
-            await message.reply("🚫 Slow down! You're sending messages too quickly.", delete_after=5)
-        except discord.Forbidden:
-            pass
-        return
-
-    # Message logging (only in guilds, not DMs)
-    if message.guild:
-        log_channel = await get_or_create_logs_channel(message.guild)
-        if log_channel:
-            try:
-                # Create embed for better formatting
-                embed = discord.Embed(
-                    description=message.content[:1900] if message.content else "*[No text content]*",
-                    color=0x3498db,
-                    timestamp=message.created_at
-                )
-                embed.set_author(
-                    name=f"{message.author.display_name} ({message.author})",
-                    icon_url=message.author.display_avatar.url
-                )
-                embed.set_footer(text=f"#{message.channel.name} • {message.guild.name}")
-                
-                # Add attachment info if present
-                if message.attachments:
-                    embed.add_field(
-                        name="Attachments",
-                        value="\n".join([att.filename for att in message.attachments]),
-                        inline=False
-                    )
-                
-                await log_channel.send(embed=embed)
-            except discord.Forbidden:
-                logger.warning(f"No permission to send to logs channel in {message.guild.name}")
-            except Exception as e:
-                logger.error(f"Error logging message: {e}")
-
-    await bot.process_commands(message)
-
-@bot.hybrid_command(name="ai", description="Chat with AI (ChatGPT or Gemini)")
-async def ai_command(ctx, ai_model: str, *, prompt: str):
-    """
-    Chat with AI models
-    
-    Parameters:
-    ai_model: Choose 'chatgpt' or 'gemini'
-    prompt: Your message to the AI
-    """
-    ai_model = ai_model.lower()
-    
-    if ai_model not in ['chatgpt', 'gemini']:
-        await ctx.send("❌ Invalid AI model. Use `chatgpt` or `gemini`.", ephemeral=True)
-        return
-    
-    # Check AI rate limiting
-    if check_spam(ctx.author.id, user_ai_times, AI_TIME_WINDOW, AI_MESSAGE_LIMIT):
-        await ctx.send("🚫 You're making too many AI requests. Please wait a minute.", ephemeral=True)
-        return
-    
-    # Check if the AI service is available
-    if ai_model == 'chatgpt' and not openai_client:
-        await ctx.send("❌ ChatGPT is not available (API key missing).", ephemeral=True)
-        return
-    
-    if ai_model == 'gemini' and not GEMINI_API_KEY:
-        await ctx.send("❌ Gemini is not available (API key missing).", ephemeral=True)
-        return
-    
-    # Defer the response since AI might take time
-    await ctx.defer()
-    
-    try:
-        if ai_model == 'chatgpt':
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: openai_client.chat.completions.create(
-                    model="gpt-4o-mini",  # Free-tier model
-                    messages=[{"role": "user", "content": prompt}],
-                    max_tokens=1000
-                )
-            )
-            ai_response = response.choices[0].message.content
-            
-        elif ai_model == 'gemini':
-            model = genai.GenerativeModel('gemini-1.5-flash')  # Free-tier model
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: model.generate_content(prompt)
-            )
-            ai_response = response.text
-        
-        # Split long responses
-        if len(ai_response) > 2000:
-            # Send in chunks
-            for i in range(0, len(ai_response), 1900):
-                chunk = ai_response[i:i+1900]
-                if i == 0:
-                    await ctx.followup.send(f"🤖 **{ai_model.title()}**: {chunk}")
-                else:
-                    await ctx.followup.send(chunk)
-        else:
-            await ctx.followup.send(f"🤖 **{ai_model.title()}**: {ai_response}")
-            
-    except Exception as e:
-        logger.error(f"AI request error: {e}")
-        await ctx.followup.send(f"⚠️ Error communicating with {ai_model.title()}: {str(e)[:100]}")
-
-@bot.hybrid_command(name="logs", description="Create or get info about the logs channel")
-@commands.has_permissions(manage_channels=True)
-async def logs_command(ctx):
-    """Create logs channel if it doesn't exist"""
-    if not ctx.guild:
-        await ctx.send("❌ This command can only be used in servers.", ephemeral=True)
-        return
-        
-    log_channel = await get_or_create_logs_channel(ctx.guild)
-    if log_channel:
-        await ctx.send(f"✅ Logs channel: {log_channel.mention}", ephemeral=True)
-    else:
-        await ctx.send("❌ Could not create or access logs channel. Check bot permissions.", ephemeral=True)
-
-@bot.hybrid_command(name="info", description="Show bot information")
-async def info_command(ctx):
-    """Display bot information"""
-    embed = discord.Embed(
-        title="🤖 Bot Information",
-        color=0x00ff00,
-        description="Discord bot with AI integration"
-    )
-    
-    # AI availability
-Jorge
-    ai_status = []
-    if openai_client:
-        ai_status.append("✅ ChatGPT")
-    else:
-        ai_status.append("❌ ChatGPT")
-        
-    if GEMINI_API_KEY:
-        ai_status.append("✅ Gemini")
-    else:
-        ai_status.append("❌ Gemini")
-    
-    embed.add_field(name="AI Services", value="\n".join(ai_status), inline=True)
-    embed.add_field(name="Servers", value=str(len(bot.guilds)), inline inline=True)
-    embed.add_field(name="Users", value=str(len(bot.users)), inline=True)
-    
-    embed.add_field(
-        name="Rate Limits",
-        value=f"Messages: {SPAM_MESSAGE_LIMIT}/{SPAM_TIME_WINDOW}s\nAI Requests: {AI_MESSAGE_LIMIT}/{AI_TIME_WINDOW}s",
-        inline=False
-    )
-    
-    await ctx.send(embed=embed)
-
-@bot.event
-async def on_command_error(ctx, error):
-    """Handle command errors"""
-    if isinstance(error, commands.MissingPermissions):
-        await ctx.send("❌ You don't have permission to use this command.", ephemeral=True)
-    elif isinstance(error, commands.CommandNotFound):
-        pass  # Ignore unknown commands
-    elif isinstance(error, commands.MissingRequiredArgument):
-        await ctx.send(f"❌ Missing required argument: `{error.param}`", ephemeral=True)
-    else:
-        logger.error(f"Command error: {error}")
-        await ctx.send("❌ An error occurred while processing the command.", ephemeral=True)
-
-if __name__ == "__main__":
-    try:
-        bot.run(TOKEN)
-    except KeyboardInterrupt:
-        logger.info("Bot stopped by user")
-    except Exception as e:
-        logger.error(f"Bot crashed: {e}")
+import discord
+from discord.ext import commands
+import os
+import array
+import asyncio
+import time
+import logging
+from collections import OrderedDict
+import aiohttp
+import httpx
+from dotenv import load_dotenv
+
+# Modern API imports
+try:
+    from openai import AsyncOpenAI
+except ImportError:
+    print("❌ Please install: pip install openai>=1.0.0")
+    exit(1)
+
+try:
+    import google.generativeai as genai
+except ImportError:
+    print("❌ Please install: pip install google-generativeai")
+    exit(1)
+
+# Redis is optional — only needed for shared rate limits across restarts/shards
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+# Load environment variables
+load_dotenv()
+
+# Configuration
+TOKEN = os.getenv("DISCORD_BOT_TOKEN")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+REDIS_URL = os.getenv("REDIS_URL")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+# Validate required environment variables
+if not TOKEN:
+    print("❌ DISCORD_BOT_TOKEN not found in environment variables")
+    exit(1)
+
+# Setup logging
+logging.basicConfig(
+    level=getattr(logging, LOG_LEVEL.upper()),
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Initialize AI clients
+openai_client = None
+openai_http_client = None
+if OPENAI_API_KEY:
+    # Generous connection pool with keep-alives so concurrent /ai requests
+    # reuse warm TLS sessions instead of handshaking per call
+    openai_http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+        timeout=httpx.Timeout(60.0)
+    )
+    openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=openai_http_client)
+    logger.info("✅ OpenAI client initialized")
+else:
+    logger.warning("⚠️ OpenAI API key not found")
+
+gemini_model = None
+if GEMINI_API_KEY:
+    genai.configure(api_key=GEMINI_API_KEY)
+    # Model name is constant, so build the client state once instead of
+    # per request
+    gemini_model = genai.GenerativeModel('gemini-1.5-flash')  # Free-tier model
+    logger.info("✅ Gemini client initialized")
+else:
+    logger.warning("⚠️ Gemini API key not found")
+
+# Optional Redis backend so rate limits survive restarts and span shards
+redis_client = None
+if REDIS_URL:
+    if aioredis:
+        redis_client = aioredis.from_url(REDIS_URL)
+        logger.info("✅ Redis rate-limit backend configured")
+    else:
+        logger.warning("⚠️ REDIS_URL set but the redis package is not installed")
+
+# Bot setup
+intents = discord.Intents.default()
+intents.message_content = True
+intents.messages = True
+intents.guilds = True
+intents.members = True
+
+bot = commands.Bot(command_prefix='/', intents=intents)
+
+# Anti-spam configuration
+SPAM_TIME_WINDOW = 10  # seconds
+SPAM_MESSAGE_LIMIT = 5  # messages allowed per window
+
+# Rate limiting for AI commands
+AI_TIME_WINDOW = 60  # seconds
+AI_MESSAGE_LIMIT = 3  # AI requests per minute
+
+# Rate limiting runs on the monotonic clock (immune to wall-clock jumps)
+# with integer nanoseconds, so comparisons stay int-vs-int
+SPAM_TIME_WINDOW_NS = SPAM_TIME_WINDOW * 1_000_000_000
+AI_TIME_WINDOW_NS = AI_TIME_WINDOW * 1_000_000_000
+
+# Hard ceiling on tracked users per dict, so a flood of unique users
+# can't spike memory faster than the GC runs
+RATE_LIMIT_MAX_USERS = int(os.getenv("RATE_LIMIT_MAX_USERS", "100000"))
+
+# Sentinel timestamp older than anything the monotonic clock can return
+_RING_EMPTY = -(1 << 62)
+
+def _new_ring(limit):
+    """Preallocated ring of the user's last `limit` event timestamps plus write index"""
+    return [array.array('q', [_RING_EMPTY] * limit), 0]
+
+class LRURateDict(OrderedDict):
+    """Per-user rate-limit state with a hard LRU capacity cap"""
+
+    def __init__(self, capacity, state_factory):
+        super().__init__()
+        self.capacity = capacity
+        self.state_factory = state_factory
+
+    def get_state(self, user_id):
+        """Fetch the user's state, creating it and evicting the LRU entry if full"""
+        state = self.get(user_id)
+        if state is None:
+            state = self.state_factory()
+            self[user_id] = state
+            if len(self) > self.capacity:
+                self.popitem(last=False)
+        else:
+            self.move_to_end(user_id)
+        return state
+
+# Per-user timestamp rings: zero allocations steady-state, exact sliding window
+user_message_times = LRURateDict(RATE_LIMIT_MAX_USERS, lambda: _new_ring(SPAM_MESSAGE_LIMIT))
+user_ai_times = LRURateDict(RATE_LIMIT_MAX_USERS, lambda: _new_ring(AI_MESSAGE_LIMIT))
+
+# Resolved logs channel per guild (None = known unavailable, e.g. no permission)
+_MISSING = object()
+_log_channel_cache = {}
+
+# Text channels indexed by name per guild, so lookups don't scan the
+# whole channel list
+_channel_name_index = {}
+
+# (default_role, bot member) per guild, resolved once instead of per
+# channel creation
+_guild_meta = {}
+
+def _get_guild_meta(guild):
+    """Return the guild's cached (default_role, bot member) pair"""
+    meta = _guild_meta.get(guild.id)
+    if meta is None:
+        meta = (guild.default_role, guild.me)
+        _guild_meta[guild.id] = meta
+    return meta
+
+def _index_guild_channels(guild):
+    """Build and store the name -> id index for a guild's text channels"""
+    index = {channel.name: channel.id for channel in guild.text_channels}
+    _channel_name_index[guild.id] = index
+    return index
+
+async def get_or_create_logs_channel(guild):
+    """Get existing logs channel or create one"""
+    cached = _log_channel_cache.get(guild.id, _MISSING)
+    if cached is not _MISSING:
+        return bot.get_channel(cached) if cached is not None else None
+
+    name_index = _channel_name_index.get(guild.id)
+    if name_index is None:
+        name_index = _index_guild_channels(guild)
+    channel_id = name_index.get("logs")
+    log_channel = guild.get_channel(channel_id) if channel_id is not None else None
+
+    if not log_channel:
+        try:
+            # Create logs channel with restricted permissions
+            default_role, bot_member = _get_guild_meta(guild)
+            overwrites = {
+                default_role: discord.PermissionOverwrite(send_messages=False),
+                bot_member: discord.PermissionOverwrite(send_messages=True)
+            }
+            log_channel = await guild.create_text_channel(
+                'logs', 
+                topic='Bot message logs',
+                overwrites=overwrites
+            )
+            logger.info("✅ Created logs channel in %s", guild.name)
+            name_index["logs"] = log_channel.id
+        except discord.Forbidden:
+            logger.error("❌ No permission to create logs channel in %s", guild.name)
+        except Exception as e:
+            logger.error("❌ Error creating logs channel: %s", e)
+
+    _log_channel_cache[guild.id] = log_channel.id if log_channel else None
+    return log_channel
+
+# Webhook URL per guild for log posting (None = use channel.send fallback)
+_log_webhook_cache = {}
+
+# Shared aiohttp session for webhook posts, created once the loop is running
+_webhook_session = None
+
+async def _get_log_webhook(log_channel):
+    """Get or create the log-relay webhook URL for a logs channel"""
+    guild_id = log_channel.guild.id
+    url = _log_webhook_cache.get(guild_id, _MISSING)
+    if url is not _MISSING:
+        return url
+
+    try:
+        webhooks = await log_channel.webhooks()
+        webhook = discord.utils.get(webhooks, name="log-relay")
+        if webhook is None:
+            webhook = await log_channel.create_webhook(name="log-relay")
+        url = webhook.url
+    except discord.HTTPException:
+        # No manage_webhooks permission (or similar) — remember to fall
+        # back to channel.send
+        url = None
+
+    _log_webhook_cache[guild_id] = url
+    return url
+
+# Pending log embeds per guild: guild_id -> (queue, flusher task), so the
+# worker can be cancelled when the bot leaves the guild
+_log_queues = {}
+LOG_QUEUE_MAXSIZE = 1000
+
+def _enqueue_log(guild_id, embed):
+    """Queue an embed for the guild's log channel without blocking on_message"""
+    entry = _log_queues.get(guild_id)
+    if entry is None:
+        queue = asyncio.Queue(maxsize=LOG_QUEUE_MAXSIZE)
+        entry = (queue, bot.loop.create_task(_flush_logs(guild_id, queue)))
+        _log_queues[guild_id] = entry
+    try:
+        entry[0].put_nowait(embed)
+    except asyncio.QueueFull:
+        # Drop log entries rather than blocking the message path when the
+        # flusher can't keep up (e.g. the logs channel is rate limited)
+        pass
+
+# Discord caps a message's combined embed text at 6000 chars; leave headroom
+# for the bits len(embed) doesn't count (avatar URLs, timestamps)
+LOG_BATCH_MAX_CHARS = 5500
+
+async def _flush_logs(guild_id, queue):
+    """Drain a guild's log queue, batching up to 10 embeds per send"""
+    pending = None
+    while True:
+        first = pending if pending is not None else await queue.get()
+        pending = None
+        embeds = [first]
+        total_chars = len(first)
+        while len(embeds) < 10 and not queue.empty():
+            embed = queue.get_nowait()
+            if total_chars + len(embed) > LOG_BATCH_MAX_CHARS:
+                # Would exceed the combined embed limit — flush what we
+                # have and carry this embed into the next batch
+                pending = embed
+                break
+            embeds.append(embed)
+            total_chars += len(embed)
+
+        channel_id = _log_channel_cache.get(guild_id)
+        log_channel = bot.get_channel(channel_id) if channel_id else None
+        if log_channel:
+            try:
+                # Prefer a webhook: it has its own rate-limit bucket, so log
+                # traffic doesn't contend with the bot's user-facing replies
+                url = await _get_log_webhook(log_channel) if _webhook_session else None
+                if url:
+                    webhook = discord.Webhook.from_url(url, session=_webhook_session)
+                    await webhook.send(embeds=embeds, wait=False)
+                else:
+                    await log_channel.send(embeds=embeds)
+            except discord.NotFound:
+                # Webhook was deleted out from under us; re-resolve next flush
+                _log_webhook_cache.pop(guild_id, None)
+            except discord.Forbidden:
+                logger.warning("No permission to send to logs channel in guild %s", guild_id)
+            except Exception as e:
+                logger.error("Error logging messages: %s", e)
+
+        # Brief pause so message bursts accumulate into larger batches
+        await asyncio.sleep(0.25)
+
+async def check_spam(user_id, state_dict, time_window, message_limit, key_prefix):
+    """Check if user is spamming, against Redis when configured else in-memory"""
+    if redis_client is None:
+        return _check_spam_local(user_id, state_dict, time_window, message_limit)
+
+    # Redis sorted-set sliding window: remove expired entries, record this
+    # event, count with ZCARD (no entry payloads transferred), and let the
+    # key expire once the user goes idle. Wall clock here — scores must be
+    # comparable across processes.
+    now = time.time()
+    window_seconds = time_window // 1_000_000_000
+    key = f"ratelimit:{key_prefix}:{user_id}"
+    try:
+        pipe = redis_client.pipeline()
+        pipe.zremrangebyscore(key, 0, now - window_seconds)
+        pipe.zadd(key, {str(now): now})
+        pipe.zcard(key)
+        pipe.expire(key, window_seconds)
+        results = await pipe.execute()
+        return results[2] > message_limit
+    except Exception as e:
+        logger.error("Redis rate-limit error, falling back to in-memory: %s", e)
+        return _check_spam_local(user_id, state_dict, time_window, message_limit)
+
+def _check_spam_local(user_id, state_dict, time_window, message_limit, _time=time.monotonic_ns):
+    """In-memory spam check (fixed-size timestamp ring, O(1) per call)"""
+    # _time is bound at definition time so each call skips the module-global
+    # and attribute lookups; time_window is in integer nanoseconds
+    now = _time()
+    ring = state_dict.get_state(user_id)
+    times, idx = ring
+    # The slot at the write index holds the limit-th most recent event; if
+    # it is still inside the window, this message would exceed the limit.
+    if now - times[idx] < time_window:
+        return True
+    times[idx] = now
+    ring[1] = (idx + 1) % message_limit
+    return False
+
+# Last time each user was warned for spamming, to cap warnings at one per window
+_warned_users = {}
+
+async def _warn_spammer(message):
+    """Send a throttled spam warning without blocking on_message"""
+    try:
+        await message.reply("🚫 Slow down! You're sending messages too quickly.", delete_after=5)
+    except discord.HTTPException:
+        pass
+
+# Handle for the rate-limit GC task, so reconnects don't spawn duplicates
+_gc_task = None
+
+async def _gc_rate_limits():
+    """Periodically drop rate-limit state for users who have gone idle"""
+    while True:
+        await asyncio.sleep(SPAM_TIME_WINDOW * 10)
+        try:
+            now = time.monotonic_ns()
+            for state_dict, time_window in (
+                (user_message_times, SPAM_TIME_WINDOW_NS),
+                (user_ai_times, AI_TIME_WINDOW_NS),
+            ):
+                for user_id, (times, idx) in list(state_dict.items()):
+                    # The most recently written slot sits just before the
+                    # write index; once it falls out of the window the user
+                    # has gone idle.
+                    if now - times[idx - 1] > time_window:
+                        del state_dict[user_id]
+            for user_id, warned_at in list(_warned_users.items()):
+                if now - warned_at > SPAM_TIME_WINDOW_NS:
+                    del _warned_users[user_id]
+        except Exception as e:
+            logger.error("Rate-limit GC error: %s", e)
+
+@bot.event
+async def on_ready():
+    global _webhook_session, _gc_task
+
+    logger.info('✅ %s is online!', bot.user)
+    logger.info('Bot is in %d guilds', len(bot.guilds))
+
+    if _webhook_session is None:
+        _webhook_session = aiohttp.ClientSession()
+
+    # Index channels by name and resolve per-guild metadata once
+    for guild in bot.guilds:
+        _index_guild_channels(guild)
+        _get_guild_meta(guild)
+
+    # Keep the rate-limit dicts bounded to active users; on_ready fires
+    # again on re-identify, so only spawn the GC task once
+    if _gc_task is None or _gc_task.done():
+        _gc_task = bot.loop.create_task(_gc_rate_limits())
+
+    # Warm up the OpenAI connection pool so the first /ai call
+    # doesn't pay the TLS handshake
+    if openai_http_client:
+        try:
+            await openai_http_client.head("https://api.openai.com/")
+        except httpx.HTTPError:
+            pass
+
+    # Sync slash commands
+    try:
+        synced = await bot.tree.sync()
+        logger.info("✅ Synced %d slash commands", len(synced))
+    except Exception as e:
+        logger.error("❌ Failed to sync slash commands: %s", e)
+
+@bot.event
+async def on_guild_join(guild):
+    """Create logs channel when bot joins a new guild"""
+    _index_guild_channels(guild)
+    _get_guild_meta(guild)
+    await get_or_create_logs_channel(guild)
+
+@bot.event
+async def on_guild_channel_create(channel):
+    """Keep the channel-name index current"""
+    if isinstance(channel, discord.TextChannel):
+        _channel_name_index.setdefault(channel.guild.id, {})[channel.name] = channel.id
+        # A manually created #logs channel supersedes a cached "unavailable"
+        # result, so logging can resume without a restart
+        if channel.name == "logs" and _log_channel_cache.get(channel.guild.id, _MISSING) is None:
+            del _log_channel_cache[channel.guild.id]
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    """Track channel renames in the name index"""
+    if isinstance(after, discord.TextChannel) and before.name != after.name:
+        index = _channel_name_index.setdefault(after.guild.id, {})
+        if index.get(before.name) == before.id:
+            del index[before.name]
+        index[after.name] = after.id
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    """Drop the cached logs channel and index entry if a channel is deleted"""
+    if _log_channel_cache.get(channel.guild.id) == channel.id:
+        del _log_channel_cache[channel.guild.id]
+        _log_webhook_cache.pop(channel.guild.id, None)
+    index = _channel_name_index.get(channel.guild.id)
+    if index and index.get(channel.name) == channel.id:
+        del index[channel.name]
+
+@bot.event
+async def on_guild_remove(guild):
+    """Forget cached state for guilds the bot leaves"""
+    _log_channel_cache.pop(guild.id, None)
+    _log_webhook_cache.pop(guild.id, None)
+    _channel_name_index.pop(guild.id, None)
+    _guild_meta.pop(guild.id, None)
+    entry = _log_queues.pop(guild.id, None)
+    if entry:
+        entry[1].cancel()
+
+@bot.event
+async def on_message(message):
+    # Hoist hot attributes into locals to avoid repeated descriptor lookups
+    author = message.author
+    guild = message.guild
+
+    if author.bot:
+        return
+
+    # Anti-spam check
+    if await check_spam(author.id, user_message_times, SPAM_TIME_WINDOW_NS, SPAM_MESSAGE_LIMIT, "spam"):
+        # Warn at most once per window, fire-and-forget, so a flood doesn't
+        # cost an HTTP POST per spam message
+        now = time.monotonic_ns()
+        if now - _warned_users.get(author.id, 0) > SPAM_TIME_WINDOW_NS:
+            _warned_users[author.id] = now
+            asyncio.create_task(_warn_spammer(message))
+        return
+
+    # Dispatch commands before any logging work so command messages don't
+    # wait behind embed construction and channel resolution
+    await bot.process_commands(message)
+
+    # Message logging (only in guilds, not DMs)
+    if guild:
+        # Skip embed construction entirely when we already know there is
+        # no usable logs channel in this guild
+        if _log_channel_cache.get(guild.id, _MISSING) is None:
+            return
+
+        log_channel = await get_or_create_logs_channel(guild)
+        if log_channel:
+            content = message.content
+            # Create embed for better formatting
+            embed = discord.Embed(
+                description=content[:1900] if content else "*[No text content]*",
+                color=0x3498db,
+                timestamp=message.created_at
+            )
+            embed.set_author(
+                name=f"{author.display_name} ({author})",
+                icon_url=author.display_avatar.url
+            )
+            embed.set_footer(text=f"#{message.channel.name} • {guild.name}")
+
+            # Add attachment info if present
+            if message.attachments:
+                embed.add_field(
+                    name="Attachments",
+                    value="\n".join([att.filename for att in message.attachments]),
+                    inline=False
+                )
+
+            _enqueue_log(guild.id, embed)
+
+@bot.hybrid_command(name="ai", description="Chat with AI (ChatGPT or Gemini)")
+async def ai_command(ctx, ai_model: str, *, prompt: str):
+    """
+    Chat with AI models
+    
+    Parameters:
+    ai_model: Choose 'chatgpt' or 'gemini'
+    prompt: Your message to the AI
+    """
+    ai_model = ai_model.lower()
+    
+    if ai_model not in ['chatgpt', 'gemini']:
+        await ctx.send("❌ Invalid AI model. Use `chatgpt` or `gemini`.", ephemeral=True)
+        return
+    
+    # Check AI rate limiting
+    if await check_spam(ctx.author.id, user_ai_times, AI_TIME_WINDOW_NS, AI_MESSAGE_LIMIT, "ai"):
+        await ctx.send("🚫 You're making too many AI requests. Please wait a minute.", ephemeral=True)
+        return
+    
+    # Check if the AI service is available
+    if ai_model == 'chatgpt' and not openai_client:
+        await ctx.send("❌ ChatGPT is not available (API key missing).", ephemeral=True)
+        return
+    
+    if ai_model == 'gemini' and not gemini_model:
+        await ctx.send("❌ Gemini is not available (API key missing).", ephemeral=True)
+        return
+    
+    # Defer the response since AI might take time
+    await ctx.defer()
+
+    header = f"🤖 **{ai_model.title()}**: "
+
+    try:
+        # Stream tokens into a single reply message, editing it about
+        # once a second so users see output early and we pay one POST plus
+        # a few PATCHes instead of one POST per 1900-char chunk. After
+        # ctx.defer(), ctx.send routes to the interaction followup and
+        # returns an editable message (and works for prefix invocation too).
+        reply = await ctx.send(f"{header}⏳")
+        ai_response = ""
+        last_edit = time.monotonic()
+
+        async def maybe_edit():
+            nonlocal last_edit
+            if time.monotonic() - last_edit > 1.0 and len(ai_response) < 1900:
+                await reply.edit(content=header + ai_response)
+                last_edit = time.monotonic()
+
+        if ai_model == 'chatgpt':
+            stream = await openai_client.chat.completions.create(
+                model="gpt-4o-mini",  # Free-tier model
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=1000,
+                stream=True
+            )
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    ai_response += delta
+                    await maybe_edit()
+
+        elif ai_model == 'gemini':
+            stream = await gemini_model.generate_content_async(prompt, stream=True)
+            async for chunk in stream:
+                if chunk.text:
+                    ai_response += chunk.text
+                    await maybe_edit()
+
+        if not ai_response:
+            ai_response = "*[Empty response]*"
+
+        # Final flush; overflow past Discord's message limit goes out as
+        # extra messages
+        await reply.edit(content=header + ai_response[:1900])
+        for i in range(1900, len(ai_response), 1900):
+            await ctx.send(ai_response[i:i+1900])
+
+    except Exception as e:
+        logger.error("AI request error: %s", e)
+        await ctx.send(f"⚠️ Error communicating with {ai_model.title()}: {str(e)[:100]}")
+
+@bot.hybrid_command(name="logs", description="Create or get info about the logs channel")
+@commands.has_permissions(manage_channels=True)
+async def logs_command(ctx):
+    """Create logs channel if it doesn't exist"""
+    if not ctx.guild:
+        await ctx.send("❌ This command can only be used in servers.", ephemeral=True)
+        return
+
+    # An explicit admin retry should bypass a cached "unavailable" result —
+    # permissions may have been granted since it was recorded
+    if _log_channel_cache.get(ctx.guild.id, _MISSING) is None:
+        del _log_channel_cache[ctx.guild.id]
+
+    log_channel = await get_or_create_logs_channel(ctx.guild)
+    if log_channel:
+        await ctx.send(f"✅ Logs channel: {log_channel.mention}", ephemeral=True)
+    else:
+        await ctx.send("❌ Could not create or access logs channel. Check bot permissions.", ephemeral=True)
+
+@bot.hybrid_command(name="info", description="Show bot information")
+async def info_command(ctx):
+    """Display bot information"""
+    embed = discord.Embed(
+        title="🤖 Bot Information",
+        color=0x00ff00,
+        description="Discord bot with AI integration"
+    )
+    
+    # AI availability
+    ai_status = []
+    if openai_client:
+        ai_status.append("✅ ChatGPT")
+    else:
+        ai_status.append("❌ ChatGPT")
+        
+    if GEMINI_API_KEY:
+        ai_status.append("✅ Gemini")
+    else:
+        ai_status.append("❌ Gemini")
+    
+    embed.add_field(name="AI Services", value="\n".join(ai_status), inline=True)
+    embed.add_field(name="Servers", value=str(len(bot.guilds)), inline=True)
+    embed.add_field(name="Users", value=str(len(bot.users)), inline=True)
+    
+    embed.add_field(
+        name="Rate Limits",
+        value=f"Messages: {SPAM_MESSAGE_LIMIT}/{SPAM_TIME_WINDOW}s\nAI Requests: {AI_MESSAGE_LIMIT}/{AI_TIME_WINDOW}s",
+        inline=False
+    )
+    
+    await ctx.send(embed=embed)
+
+@bot.event
+async def on_command_error(ctx, error):
+    """Handle command errors"""
+    if isinstance(error, commands.MissingPermissions):
+        await ctx.send("❌ You don't have permission to use this command.", ephemeral=True)
+    elif isinstance(error, commands.CommandNotFound):
+        pass  # Ignore unknown commands
+    elif isinstance(error, commands.MissingRequiredArgument):
+        await ctx.send(f"❌ Missing required argument: `{error.param}`", ephemeral=True)
+    else:
+        logger.error("Command error: %s", error)
+        await ctx.send("❌ An error occurred while processing the command.", ephemeral=True)
+
+if __name__ == "__main__":
+    # Use a faster event loop implementation when available
+    try:
+        import uvloop
+        uvloop.install()
+        logger.info("✅ Using uvloop event loop")
+    except ImportError:
+        try:
+            import winloop
+            winloop.install()
+            logger.info("✅ Using winloop event loop")
+        except ImportError:
+            logger.info("Using default asyncio event loop")
+
+    try:
+        bot.run(TOKEN)
+    except KeyboardInterrupt:
+        logger.info("Bot stopped by user")
+    except Exception as e:
+        logger.error("Bot crashed: %s", e)
+    finally:
+        async def _close_http_clients():
+            if openai_http_client:
+                await openai_http_client.aclose()
+            if _webhook_session:
+                await _webhook_session.close()
+        asyncio.run(_close_http_clients())